@@ -0,0 +1,128 @@
+"""Сценарии нагрузочного прогона API через тестовый клиент Django."""
+import math
+import random
+import time
+
+from django.db import connection
+from rest_framework.test import APIClient
+
+from foodstuffs_assistant.models import Ingredient, Tag
+from recipes.fake_data import WORDS
+from users.models import User
+from .middleware import QueryRecorder
+
+# Сколько пользователей по очереди отправляют запросы
+USERS_SAMPLE = 200
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class Benchmark:
+    """Выполняет сценарии и собирает для каждого задержки (p50/p95),
+    число SQL-запросов на запрос и пропускную способность."""
+
+    def __init__(self, user_ids, recipe_ids, seed=0):
+        self.random = random.Random(seed)
+        self.user_ids = user_ids
+        self.recipe_ids = recipe_ids
+        self.tags = list(Tag.objects.values_list('slug', flat=True))
+        self.prefixes = sorted({
+            name[:3] for name in Ingredient.objects.values_list(
+                'name', flat=True)[:500]})
+        self.users = list(User.objects.filter(pk__in=self.random.sample(
+            user_ids, min(len(user_ids), USERS_SAMPLE))))
+        self.anonymous = APIClient()
+        self.client = APIClient()
+
+    def authenticate(self):
+        # пользователи загружены заранее, чтобы не считать их запросы
+        self.client.force_authenticate(self.random.choice(self.users))
+        return self.client
+
+    def scenarios(self):
+        """Имя сценария -> функция, выполняющая один запрос."""
+        choice = self.random.choice
+        return {
+            'recipe_list_anonymous': lambda: self.anonymous.get(
+                '/api/recipes/', {'page': self.random.randint(1, 10)}),
+            'recipe_list': lambda: self.authenticate().get(
+                '/api/recipes/', {'page': self.random.randint(1, 10)}),
+            'recipe_detail': lambda: self.authenticate().get(
+                f'/api/recipes/{choice(self.recipe_ids)}/'),
+            'recipe_list_filtered': lambda: self.authenticate().get(
+                '/api/recipes/', {'tags': self.random.sample(self.tags, 2),
+                                  'author': choice(self.user_ids)}),
+            'recipe_search': lambda: self.authenticate().get(
+                '/api/recipes/', {'search': choice(WORDS)}),
+            'subscriptions': lambda: self.authenticate().get(
+                '/api/users/subscriptions/', {'recipes_limit': 3}),
+            'favorite_toggle': self.toggle_favorite,
+            'ingredient_autocomplete': lambda: self.anonymous.get(
+                '/api/ingredients/', {'name': choice(self.prefixes)}),
+            'shopping_cart_download': lambda: self.authenticate().get(
+                '/api/recipes/download_shopping_cart/'),
+        }
+
+    def toggle_favorite(self):
+        client = self.authenticate()
+        url = f'/api/recipes/{self.random.choice(self.recipe_ids)}/favorite/'
+        response = client.post(url)
+        if response.status_code == 400:
+            return client.delete(url)
+        return response
+
+    def measure(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return time.perf_counter() - started, recorder.queries, response
+
+    def run(self, requests, warmup=10, only=None):
+        results = {}
+        for name, request in self.scenarios().items():
+            if only and name not in only:
+                continue
+            for _ in range(warmup):
+                request()
+            timings, queries, errors = [], 0, 0
+            started = time.perf_counter()
+            for _ in range(requests):
+                duration, count, response = self.measure(request)
+                timings.append(duration)
+                queries += count
+                errors += response.status_code >= 400
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                'requests': requests,
+                'errors': errors,
+                'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+                'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+                'mean_ms': round(sum(timings) / requests * 1000, 3),
+                'queries_per_request': round(queries / requests, 2),
+                'throughput_rps': round(requests / elapsed, 1),
+            }
+        return results
+
+
+def compare(results, baseline, max_regression):
+    """Список описаний ухудшений относительно прошлого прогона."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            regressions.append(
+                f'{name}: p95 {previous["p95_ms"]} -> '
+                f'{current["p95_ms"]} мс')
+        if current['queries_per_request'] > previous['queries_per_request']:
+            regressions.append(
+                f'{name}: запросов к БД {previous["queries_per_request"]} '
+                f'-> {current["queries_per_request"]}')
+    return regressions
@@ -0,0 +1,118 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from foodstuffs_assistant.models import Tag
+
+CATALOG_VERSION_KEY = 'recipes:catalog-version'
+HITS_KEY = 'recipes:cache-hits'
+MISSES_KEY = 'recipes:cache-misses'
+TABLE_VERSION_KEY = 'table-version:{}'
+# Тэги, изменённые в обход сигналов, видны не позже чем через столько
+# секунд
+TAG_IDS_TIMEOUT = 60
+
+# Сериализованные полные списки справочников: label -> (версия, байты)
+_table_blobs = {}
+# Словарь слаг тэга -> id: (версия таблицы, время загрузки, словарь)
+_tag_ids = (None, float('-inf'), {})
+
+
+def _incr(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # ключ успел вытесниться между add и incr
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        return cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    """Делает недействительными все закешированные списки рецептов."""
+    transaction.on_commit(lambda: _incr(CATALOG_VERSION_KEY))
+
+
+def make_key(request):
+    query = '&'.join(
+        f'{name}={value}'
+        for name, values in sorted(request.query_params.lists())
+        for value in sorted(values))
+    url = f'{request.get_host()}{request.path}?{query}'
+    return (f'recipes:list:{get_catalog_version()}:'
+            f'{hashlib.md5(url.encode()).hexdigest()}')
+
+
+def get_cached(key):
+    data = cache.get(key)
+    _incr(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_cached(key, data):
+    cache.set(key, data, timeout=settings.RECIPE_CACHE_TIMEOUT)
+
+
+def stats():
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+        'catalog_version': get_catalog_version(),
+    }
+
+
+def get_table_version(model):
+    """Время последнего изменения таблицы ``model`` (в секундах).
+
+    Версию меняют сигналы сохранения и удаления. Код, пишущий в обход
+    сигналов (bulk_create, update, COPY), вызывает bump_table_version
+    сам.
+    """
+    key = TABLE_VERSION_KEY.format(model._meta.label_lower)
+    version = cache.get(key)
+    if version is None:
+        now = time.time()
+        cache.add(key, now, timeout=None)
+        return cache.get(key, now)
+    return version
+
+
+def bump_table_version(model):
+    key = TABLE_VERSION_KEY.format(model._meta.label_lower)
+    transaction.on_commit(
+        lambda: cache.set(key, time.time(), timeout=None))
+
+
+def get_table_blob(model, version):
+    blob = _table_blobs.get(model._meta.label_lower)
+    if blob is not None and blob[0] == version:
+        return blob[1]
+    return None
+
+
+def set_table_blob(model, version, content):
+    _table_blobs[model._meta.label_lower] = (version, content)
+
+
+def get_tag_ids():
+    """Словарь слаг -> id тэга; перечитывается при изменении тэгов и не
+    реже раза в TAG_IDS_TIMEOUT секунд."""
+    global _tag_ids
+    version = cache.get(TABLE_VERSION_KEY.format(Tag._meta.label_lower))
+    stored_version, loaded_at, tag_ids = _tag_ids
+    if (stored_version != version
+            or time.monotonic() - loaded_at > TAG_IDS_TIMEOUT):
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        _tag_ids = (version, time.monotonic(), tag_ids)
+    return tag_ids
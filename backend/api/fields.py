@@ -1,13 +1,93 @@
 import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image
 from rest_framework import serializers
 
+# Сигнатуры в начале файла -> (MIME-тип, расширение)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', ('image/jpeg', 'jpg')),
+    (b'\x89PNG\r\n\x1a\n', ('image/png', 'png')),
+    (b'GIF87a', ('image/gif', 'gif')),
+    (b'GIF89a', ('image/gif', 'gif')),
+)
+# Кратно 4, чтобы каждый кусок декодировался независимо
+CHUNK_SIZE = 64 * 1024
+
+
+def sniff_image_type(header):
+    for signature, image_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp', 'webp'
+    return None
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректная строка base64.',
+        'unsupported': 'Поддерживаются только JPEG, PNG, GIF и WebP.',
+        'too_large': 'Размер изображения превышает {max_size} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            # полная проверка изображения выполняется в фоновой задаче
+            return serializers.FileField.to_internal_value(
+                self, self.decode(data.partition(';base64,')[2]))
         return super().to_internal_value(data)
+
+    def decode(self, imgstr):
+        """Декодирует base64 по частям во временный файл на диске.
+
+        Тип и заявленный размер проверяются до декодирования всей
+        строки, размеры в пикселях — по заголовку, без распаковки.
+        """
+        max_size = settings.IMAGE_MAX_SIZE
+        if len(imgstr) // 4 * 3 > max_size + 2:
+            self.fail('too_large', max_size=max_size)
+        content_type, ext = self.sniff(imgstr)
+        upload = TemporaryUploadedFile('temp.' + ext, content_type, 0, None)
+        try:
+            self.write_chunks(imgstr, upload)
+            if upload.size > max_size:
+                self.fail('too_large', max_size=max_size)
+            self.check_pixels(upload)
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        return upload
+
+    def sniff(self, imgstr):
+        try:
+            header = base64.b64decode(imgstr[:16], validate=True)
+        except binascii.Error:
+            self.fail('invalid_base64')
+        image_type = sniff_image_type(header)
+        if image_type is None:
+            self.fail('unsupported')
+        return image_type
+
+    def write_chunks(self, imgstr, upload):
+        try:
+            for start in range(0, len(imgstr), CHUNK_SIZE):
+                upload.write(base64.b64decode(
+                    imgstr[start:start + CHUNK_SIZE], validate=True))
+        except binascii.Error:
+            self.fail('invalid_base64')
+        upload.size = upload.tell()
+        upload.seek(0)
+
+    def check_pixels(self, upload):
+        try:
+            with Image.open(upload.temporary_file_path()) as image:
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels',
+                      max_pixels=settings.IMAGE_MAX_PIXELS)
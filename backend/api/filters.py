@@ -1,15 +1,20 @@
 import django_filters
 from rest_framework import filters
 
-from recipes.models import Recipe, Tag
+from foodstuffs_assistant.index import ingredient_index
+from recipes import search
+from recipes.models import Recipe
 from users.models import User
+from .cache import get_tag_ids
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
 
 
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug')
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
     author = django_filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = django_filters.BooleanFilter(method='filter_is_favorited')
 
@@ -17,11 +22,35 @@ class RecipeFilter(django_filters.FilterSet):
         model = Recipe
         fields = ('author', 'tags',)
 
+    def filter_tags(self, queryset, name, value):
+        # подзапрос вместо JOIN: рецепты с несколькими тэгами не дублируются
+        tag_ids = get_tag_ids()
+        return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+            tag_id__in=[tag_ids[slug] for slug in value if slug in tag_ids]
+        ).values('recipe_id'))
+
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
 
 class IngredientSearchFilter(filters.SearchFilter):
     search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param)
+        if not query or getattr(view, 'action', None) != 'list':
+            return super().filter_queryset(request, queryset, view)
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        return ingredient_index.search(query, limit)
+
+
+class RecipeSearchFilter(filters.SearchFilter):
+    """Поиск по названию, описанию и ингредиентам с сортировкой
+    по релевантности."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search.search(queryset, query[:200])
@@ -0,0 +1,113 @@
+import json
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.benchmark import Benchmark, compare
+from recipes.fake_data import FakeDataGenerator
+from recipes.models import Recipe
+from users.models import User
+
+# Отдельный кеш, чтобы не смешивать данные прогона с рабочими
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон API на отдельной тестовой базе, '
+            'заполненной синтетическими данными. Результаты '
+            'сохраняются в JSON для сравнения между прогонами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--carts', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Число запросов в каждом сценарии.')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанные сценарии.')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу и использовать уже '
+                 'заполненную при следующем запуске.')
+        parser.add_argument('--output', default=None)
+        parser.add_argument(
+            '--compare', default=None,
+            help='JSON прошлого прогона: при ухудшении команда '
+                 'завершится с ошибкой.')
+        parser.add_argument(
+            '--max-regression', type=float, default=0.25,
+            help='Допустимый рост p95 (доля), по умолчанию 0.25.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['scenarios']
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            # картинки-заглушки не должны попасть в рабочий media
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(CACHES=BENCHMARK_CACHES,
+                                       MEDIA_ROOT=media_root):
+                    report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+
+        output = options['output'] or time.strftime(
+            'benchmark-%Y%m%d-%H%M%S.json')
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        for name, result in report['scenarios'].items():
+            self.stdout.write(
+                f'{name:<26} p50 {result["p50_ms"]:>8.2f} мс  '
+                f'p95 {result["p95_ms"]:>8.2f} мс  '
+                f'запросов {result["queries_per_request"]:>6}  '
+                f'{result["throughput_rps"]:>7} rps  '
+                f'ошибок {result["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {output}'))
+        if baseline is not None:
+            regressions = compare(report['scenarios'], baseline,
+                                  options['max_regression'])
+            if regressions:
+                raise CommandError(
+                    'Ухудшения по сравнению с прошлым прогоном:\n'
+                    + '\n'.join(regressions))
+
+    def run(self, options):
+        scale = {key: options[key] for key in
+                 ('users', 'recipes', 'favorites', 'follows', 'carts')}
+        started = time.monotonic()
+        if options['keepdb'] and Recipe.objects.exists():
+            user_ids = list(User.objects.values_list('id', flat=True))
+            recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        else:
+            user_ids, recipe_ids = FakeDataGenerator(
+                seed=options['seed']).run(**scale)
+        self.stdout.write(
+            f'Данные готовы за {time.monotonic() - started:.1f} с: '
+            f'пользователей {len(user_ids)}, рецептов {len(recipe_ids)}.')
+        scenarios = Benchmark(user_ids, recipe_ids, options['seed']).run(
+            options['requests'], options['warmup'], options['scenarios'])
+        return {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': connection.vendor,
+            'seed': options['seed'],
+            'scale': scale,
+            'scenarios': scenarios,
+        }
@@ -0,0 +1,125 @@
+"""Метрики запросов в формате Prometheus.
+
+Гистограммы накапливаются в памяти процесса и не чаще раза в
+``METRICS_FLUSH_INTERVAL`` секунд копируются в общий кеш, откуда
+``/api/metrics`` собирает и суммирует данные всех воркеров.
+"""
+import os
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import cache as recipe_cache
+
+PROCESS_KEY = 'metrics:process:{}'
+PROCESSES_KEY = 'metrics:processes'
+# Снимок умершего процесса пропадает из метрик через это время
+PROCESS_TIMEOUT = 3600
+LABELS = ('view', 'action')
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = (
+    ('foodgram_request_duration_seconds',
+     'Время обработки запроса.', TIME_BUCKETS),
+    ('foodgram_db_queries', 'Число SQL-запросов за запрос.', QUERY_BUCKETS),
+    ('foodgram_db_duration_seconds',
+     'Суммарное время SQL-запросов за запрос.', TIME_BUCKETS),
+    ('foodgram_render_duration_seconds',
+     'Время сериализации ответа в JSON.', TIME_BUCKETS),
+    ('foodgram_response_size_bytes', 'Размер ответа.', SIZE_BUCKETS),
+)
+BUCKETS = {name: buckets for name, _, buckets in HISTOGRAMS}
+
+
+class Registry:
+    """Гистограммы вида {имя: {метки: [счётчики корзин..., сумма]}}.
+
+    В каждой корзине хранится число значений, попавших именно в неё;
+    накопительные счётчики ``le`` считаются при выводе.
+    """
+
+    def __init__(self):
+        self.histograms = {name: {} for name in BUCKETS}
+        self.flushed_at = time.monotonic()
+
+    def observe(self, name, labels, value):
+        buckets = BUCKETS[name]
+        series = self.histograms[name].get(labels)
+        if series is None:
+            series = self.histograms[name][labels] = [0] * (
+                len(buckets) + 2)
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def flush(self, force=False):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+        if not force and time.monotonic() - self.flushed_at < interval:
+            return
+        self.flushed_at = time.monotonic()
+        pid = os.getpid()
+        cache.set(PROCESS_KEY.format(pid), self.histograms,
+                  timeout=PROCESS_TIMEOUT)
+        processes = cache.get(PROCESSES_KEY) or set()
+        if pid not in processes:
+            cache.set(PROCESSES_KEY, processes | {pid}, timeout=None)
+
+    def collect(self):
+        """Суммирует снимки всех процессов."""
+        self.flush(force=True)
+        processes = cache.get(PROCESSES_KEY) or set()
+        snapshots = cache.get_many(
+            [PROCESS_KEY.format(pid) for pid in processes])
+        if len(snapshots) < len(processes):
+            cache.set(PROCESSES_KEY, {
+                pid for pid in processes
+                if PROCESS_KEY.format(pid) in snapshots}, timeout=None)
+        total = {name: {} for name in BUCKETS}
+        for histograms in snapshots.values():
+            for name, series in histograms.items():
+                for labels, values in series.items():
+                    current = total[name].setdefault(
+                        labels, [0] * len(values))
+                    for index, value in enumerate(values):
+                        current[index] += value
+        return total
+
+
+registry = Registry()
+
+
+def format_labels(labels, **extra):
+    pairs = list(zip(LABELS, labels)) + list(extra.items())
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"')) for key, value in pairs)
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    histograms = registry.collect()
+    for name, documentation, buckets in HISTOGRAMS:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, values in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{format_labels(labels, le=bound)}}} '
+                    f'{cumulative}')
+            lines.append(f'{name}_sum{{{format_labels(labels)}}} '
+                         f'{values[-1]}')
+            lines.append(f'{name}_count{{{format_labels(labels)}}} '
+                         f'{cumulative}')
+    stats = recipe_cache.stats()
+    for name, key in (('foodgram_recipe_cache_hits_total', 'hits'),
+                      ('foodgram_recipe_cache_misses_total', 'misses')):
+        lines.append(f'# TYPE {name} counter')
+        lines.append(f'{name} {stats[key]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,87 @@
+import time
+
+from django.db import connection
+
+from .metrics import registry
+
+
+class QueryRecorder:
+    """Обёртка для connection.execute_wrapper: считает SQL-запросы и их
+    время, не сохраняя текст запросов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Записывает для каждого запроса время обработки, число и время
+    SQL-запросов, время рендеринга и размер ответа с метками view и
+    action (для вьюсетов DRF)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        recorder = QueryRecorder()
+        request._metrics_render = 0.0
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        labels = getattr(request, '_metrics_labels', ('unknown', ''))
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, labels, recorder,
+                started)
+        else:
+            self.observe(request, labels, recorder, started,
+                         len(response.content))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', view_func)
+        action = getattr(view_func, 'actions', {}).get(
+            request.method.lower(), request.method.lower())
+        request._metrics_labels = (view.__name__, action)
+
+    def process_template_response(self, request, response):
+        # DRF рендерит Response после этого хука
+        rendering_started = time.perf_counter()
+
+        def finish_rendering(response):
+            request._metrics_render = (
+                time.perf_counter() - rendering_started)
+
+        response.add_post_render_callback(finish_rendering)
+        return response
+
+    def stream(self, content, request, labels, recorder, started):
+        """Продолжает учёт, пока отдаётся потоковый ответ: его запросы
+        к базе выполняются уже после выхода из middleware."""
+        size = 0
+        try:
+            with connection.execute_wrapper(recorder):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.observe(request, labels, recorder, started, size)
+
+    def observe(self, request, labels, recorder, started, size):
+        registry.observe('foodgram_request_duration_seconds', labels,
+                         time.perf_counter() - started)
+        registry.observe('foodgram_db_queries', labels, recorder.queries)
+        registry.observe('foodgram_db_duration_seconds', labels,
+                         recorder.duration)
+        registry.observe('foodgram_render_duration_seconds', labels,
+                         request._metrics_render)
+        registry.observe('foodgram_response_size_bytes', labels, size)
+        registry.flush()
@@ -1,5 +1,70 @@
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.db import estimate_count
+
+# Сортировки, при которых возможна пагинация курсором
+ID_ORDERINGS = ('id', '-id', 'pk', '-pk')
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным режимом курсора.
+
+    Если в запросе есть параметр ``cursor`` (для первой страницы пустой),
+    выборка идёт по условию ``id < cursor`` (или ``id > cursor`` при
+    сортировке по возрастанию) без OFFSET и COUNT(*). ``count=approx``
+    добавляет в ответ оценку числа записей. Выборки с другой сортировкой,
+    например результаты поиска по релевантности, разбиваются на страницы
+    по номеру, чтобы не терять порядок.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            and (not ordering or ordering[0] in ID_ORDERINGS))
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.descending = bool(ordering) and ordering[0] in ('-id', '-pk')
+        queryset = queryset.order_by('-id' if self.descending else 'id')
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'approx':
+            self.count = self.approximate_count(queryset)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            if not cursor.isdigit():
+                raise NotFound('Неверный курсор.')
+            queryset = queryset.filter(**{
+                'id__lt' if self.descending else 'id__gt': int(cursor)})
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = page[page_size - 1].id if len(
+            page) > page_size else None
+        return page[:page_size]
+
+    def approximate_count(self, queryset):
+        estimate = estimate_count(queryset)
+        return queryset.count() if estimate is None else estimate
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
@@ -1,15 +1,23 @@
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from foodstuffs_assistant.models import Ingredient, Tag
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.relations import PrimaryKeyRelatedField
 
-from recipes.models import Recipe, RecipeIngredient
-from users.models import User
+from recipes import images, shopping_list
+from recipes.models import Recipe, RecipeIngredient, ShoppingListItem
+from users.models import User, UserStats
 from .fields import Base64ImageField
 
 
+def get_image_urls(recipe, request):
+    if not recipe.image or recipe.image_status != Recipe.IMAGE_READY:
+        return None
+    build_url = request.build_absolute_uri if request else str
+    return images.rendition_urls(recipe.image.name, build_url)
+
+
 class IngredientSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -53,6 +61,8 @@ class GetUserSerializer(UserSerializer):
         model = User
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (not user.is_anonymous
                 and user.follower.filter(author=obj.id).exists())
@@ -75,19 +85,32 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = GetUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
-        fields = ('id', 'author', 'name', 'image', 'text',
-                  'ingredients', 'tags', 'cooking_time',
+        fields = ('id', 'author', 'name', 'image', 'images', 'image_status',
+                  'text', 'ingredients', 'tags', 'cooking_time',
                   'is_favorited', 'is_in_shopping_cart')
         model = Recipe
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_subscribed'):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
+
+    def get_images(self, obj):
+        return get_image_urls(obj, self.context.get('request'))
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (not user.is_anonymous
                 and user.favorites.filter(recipe=obj.id).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return (not user.is_anonymous
                 and user.added_to_cart.filter(recipe=obj.id).exists())
@@ -104,18 +127,57 @@ class PostRecipeSerializer(serializers.ModelSerializer):
                   'ingredients', 'cooking_time')
         model = Recipe
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            # временный файл уже перемещён хранилищем, закрываем дескриптор
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
     def new_ingredients(self, curr_ingredients, curr_recipe):
-        ingredient_objs = [
+        RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=curr_recipe,
-                ingredient=get_object_or_404(
-                    Ingredient, id=new_ingredient.get('id')),
-                amount=new_ingredient.get('amount')
+                ingredient=new_ingredient['ingredient'],
+                amount=new_ingredient['amount']
             )
             for new_ingredient in curr_ingredients
-        ]
-        RecipeIngredient.objects.bulk_create(ingredient_objs)
-
+        )
+
+    def update_ingredients(self, curr_ingredients, curr_recipe):
+        """Меняет только добавленные, изменённые и удалённые ингредиенты.
+
+        Возвращает прежний состав рецепта: ингредиент -> количество.
+        """
+        existing = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in RecipeIngredient.objects.filter(
+                recipe=curr_recipe).values_list('id', 'ingredient', 'amount')
+        }
+        to_create = []
+        to_update = []
+        for new_ingredient in curr_ingredients:
+            pk, amount = existing.get(new_ingredient['id'], (None, None))
+            if pk is None:
+                to_create.append(new_ingredient)
+            elif amount != new_ingredient['amount']:
+                to_update.append(RecipeIngredient(
+                    id=pk, amount=new_ingredient['amount']))
+        kept = {new_ingredient['id'] for new_ingredient in curr_ingredients}
+        removed = [pk for ingredient_id, (pk, _) in existing.items()
+                   if ingredient_id not in kept]
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            self.new_ingredients(to_create, curr_recipe)
+        return {ingredient_id: amount
+                for ingredient_id, (_, amount) in existing.items()}
+
+    @transaction.atomic
     def create(self, validated_data):
         post_ingredients = validated_data.pop('ingredients')
         post_tags = validated_data.pop('tags')
@@ -125,30 +187,40 @@ class PostRecipeSerializer(serializers.ModelSerializer):
         return new_recipe
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user).get(pk=instance.pk)
         return RecipeSerializer(
             instance,
-            context={'request': self.context.get('request')}
+            context={'request': request}
         ).data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         update_ingredients = validated_data.pop('ingredients')
         update_tags = validated_data.pop('tags')
         super().update(instance, validated_data)
         instance.tags.set(update_tags)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.new_ingredients(update_ingredients, instance)
+        old_amounts = self.update_ingredients(update_ingredients, instance)
+        shopping_list.change_recipe(
+            instance.id, old_amounts,
+            {item['id']: item['amount'] for item in update_ingredients})
         return instance
 
     def validate_ingredients(self, ingredients):
         if not ingredients:
             raise ValidationError('Нужно добавить хотя бы один ингредиент!')
-        ingred_list = [[item['id'], item['amount']] for item in ingredients]
-        for ingredient in ingred_list:
-            if list(map(list, zip(*ingred_list)))[0].count(ingredient[0]) > 1:
-                raise ValidationError('Ингредиенты не могут повторяться!')
-            if int(ingredient[1]) <= 0:
-                raise ValidationError(
-                    'Количество ингредиента должно быть больше 0!')
+        ids = [item['id'] for item in ingredients]
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Ингредиенты не могут повторяться!')
+        if any(int(item['amount']) <= 0 for item in ingredients):
+            raise ValidationError(
+                'Количество ингредиента должно быть больше 0!')
+        found = Ingredient.objects.in_bulk(ids)
+        if len(found) != len(ids):
+            raise ValidationError('Ингредиент не найден!')
+        for item in ingredients:
+            item['ingredient'] = found[item['id']]
         return ingredients
 
     def validate_tags(self, tags):
@@ -157,12 +229,35 @@ class PostRecipeSerializer(serializers.ModelSerializer):
         return tags
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        fields = ('id', 'name', 'measurement_unit', 'total_amount')
+        model = ShoppingListItem
+
+
 class RecipeShortSerializer(serializers.ModelSerializer):
+    images = serializers.SerializerMethodField()
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'image_status',
+                  'cooking_time')
         model = Recipe
 
+    def get_images(self, obj):
+        return get_image_urls(obj, self.context.get('request'))
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    recipe = RecipeShortSerializer()
+    matched = serializers.IntegerField()
+    missing = IngredientSerializer(many=True)
+
 
 class UserSubscriptionSerializer(serializers.ModelSerializer):
     recipes = RecipeShortSerializer(many=True, read_only=True)
@@ -178,4 +273,10 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
         return True
 
     def get_recipes_count(self, object):
-        return Recipe.objects.filter(author=object).count()
+        try:
+            return object.stats.recipes_count
+        except UserStats.DoesNotExist:
+            # строку счётчиков создают миграция, сигнал и команда recount,
+            # у пользователей, созданных в обход них, её может не быть;
+            # object.recipes здесь уже урезан recipes_limit
+            return Recipe.objects.filter(author=object).count()
@@ -0,0 +1,49 @@
+import csv
+import json
+
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ExportFormatNegotiation(DefaultContentNegotiation):
+    """Не даёт DRF трактовать ?format= как выбор рендерера."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def as_txt(items):
+    yield 'Список покупок:\n\n'
+    for item in items:
+        yield (f"{item['name']}: {item['total_amount']} "
+               f"{item['measurement_unit']}\n")
+
+
+def as_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'total_amount'))
+    for item in items:
+        yield writer.writerow(
+            (item['name'], item['measurement_unit'], item['total_amount']))
+
+
+def as_json(items):
+    yield '['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', as_txt),
+    'csv': ('text/csv; charset=utf-8', as_csv),
+    'json': ('application/json', as_json),
+}
@@ -0,0 +1,36 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from foodstuffs_assistant.models import Ingredient, Tag
+from recipes.models import Recipe, RecipeIngredient
+from users.models import User
+from . import cache
+
+# Поля автора, которые выводятся в списках рецептов
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_catalog_version(**kwargs):
+    cache.bump_catalog_version()
+
+
+@receiver(post_save, sender=User)
+def bump_catalog_version_for_author(instance, created, update_fields,
+                                    **kwargs):
+    """Списки рецептов содержат данные автора. Сохранения без этих
+    полей (например, last_login при входе) кеш не сбрасывают."""
+    if created or (update_fields is not None
+                   and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    cache.bump_catalog_version()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_table_version(sender, **kwargs):
+    cache.bump_table_version(sender)
@@ -1,8 +1,8 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
 
 from users.views import CustomUserViewSet
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet, metrics
 
 app_name = 'api'
 
@@ -14,6 +14,7 @@ router.register(r'ingredients', IngredientViewSet,
                 basename='ingredients')
 
 urlpatterns = [
+    re_path(r'^metrics/?$', metrics, name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
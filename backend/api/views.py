@@ -1,24 +1,38 @@
-import os.path
+import hashlib
 
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import (HttpResponse, HttpResponseForbidden,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from foodgram.settings import MEDIA_ROOT
 from foodstuffs_assistant.models import Ingredient, Tag
-from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
-from .filters import IngredientSearchFilter, RecipeFilter
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from recipes.ndjson import export_recipes
+from recipes.pantry import pantry_index
+from . import cache
+from .filters import (IngredientSearchFilter, RecipeFilter,
+                      RecipeSearchFilter)
+from .metrics import render as render_metrics
 from .pagination import CustomPageNumberPagination
 from .permissions import IsAdminOrReadOnly, IsAuthorOrAdminOrReadOnly
 from .serializers import (IngredientSerializer, PostRecipeSerializer,
-                          RecipeSerializer, RecipeShortSerializer,
+                          RecipeMatchSerializer, RecipeSerializer,
+                          RecipeShortSerializer, ShoppingListItemSerializer,
                           TagSerializer)
+from .shopping_cart import FORMATS, ExportFormatNegotiation
+
+# Наибольшее число рецептов в подборке по ингредиентам
+MATCH_LIMIT = 100
 
 
 class CustomViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
@@ -29,6 +43,32 @@ class CustomViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
 
+    def list(self, request, *args, **kwargs):
+        model = self.queryset.model
+        version = cache.get_table_version(model)
+        query = request.query_params.urlencode()
+        etag = quote_etag('{}-{!r}-{}'.format(
+            model._meta.model_name, version,
+            hashlib.md5(query.encode()).hexdigest()[:8]))
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(version))
+        if not_modified is not None:
+            return not_modified
+        if query or request.accepted_renderer.format != 'json':
+            response = super().list(request, *args, **kwargs)
+        else:
+            content = cache.get_table_blob(model, version)
+            if content is None:
+                content = request.accepted_renderer.render(
+                    self.get_serializer(
+                        self.get_queryset(), many=True).data)
+                cache.set_table_blob(model, version, content)
+            response = HttpResponse(
+                content, content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        return response
+
 
 class TagViewSet(CustomViewSet):
     queryset = Tag.objects.all()
@@ -43,18 +83,32 @@ class IngredientViewSet(CustomViewSet):
 
 class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPagination
     search_fields = ('name',)
 
     def get_queryset(self):
-        user = self.request.user
+        queryset = Recipe.objects.with_related().with_user_flags(
+            self.request.user)
         if self.request.query_params.get('is_favorited'):
-            return Recipe.objects.filter(favorites__user=user)
+            return queryset.filter(is_favorited=True)
         if self.request.query_params.get('is_in_shopping_cart'):
-            return Recipe.objects.filter(added_to_cart__user=user)
-        return Recipe.objects.all()
+            return queryset.filter(is_in_shopping_cart=True)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return super().list(request, *args, **kwargs)
+        key = cache.make_key(request)
+        data = cache.get_cached(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set_cached(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -64,34 +118,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def perform_destroy(self, instance):
-        image_path = os.path.join(MEDIA_ROOT, str(instance.image))
-        os.remove(image_path)
-        instance.delete()
-
     @action(
         url_path='download_shopping_cart',
         methods=['get'],
         detail=False,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        content_negotiation_class=ExportFormatNegotiation
     )
     def get_download_shopping_cart(self, request):
-        shopping_cart = ShoppingCart.objects.filter(user=self.request.user)
-        recipes = list(shopping_cart.values_list('recipe_id', flat=True))
-        shopping_list = RecipeIngredient.objects.filter(
-            recipe__in=recipes).values(
-            'ingredient__name', 'ingredient__measurement_unit').annotate(
-            total_amount=Sum('amount'))
-        shopping_list_text = 'Список покупок:\n\n'
-        for item in shopping_list:
-            shopping_list_text += (
-                f"{item['ingredient__name']}: {item['total_amount']} "
-                f"{item['ingredient__measurement_unit']}\n")
-        filename = f'{request.user.username}_shopping_cart.txt'
-        response = HttpResponse(shopping_list_text, content_type='text/plain')
+        export_format = request.query_params.get('format', 'txt')
+        if export_format not in FORMATS:
+            return Response(
+                f'Доступные форматы: {", ".join(FORMATS)}.',
+                status=status.HTTP_400_BAD_REQUEST)
+        content_type, render = FORMATS[export_format]
+        shopping_list = ShoppingListItem.objects.filter(
+            user=request.user).values(
+            'total_amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        ).order_by('name')
+        filename = f'{request.user.username}_shopping_cart.{export_format}'
+        response = StreamingHttpResponse(
+            render(shopping_list.iterator()), content_type=content_type)
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
+    @action(
+        url_path='export',
+        methods=['get'],
+        detail=False,
+        permission_classes=(IsAdminUser,)
+    )
+    def get_export(self, request):
+        response = StreamingHttpResponse(
+            export_recipes(), content_type='application/x-ndjson')
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"')
+        return response
+
+    @action(
+        url_path='cache_stats',
+        methods=['get'],
+        detail=False,
+        permission_classes=(IsAdminUser,)
+    )
+    def get_cache_stats(self, request):
+        return Response(cache.stats())
+
+    @action(
+        url_path='shopping_list',
+        methods=['get'],
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def get_shopping_list(self, request):
+        shopping_list = ShoppingListItem.objects.filter(
+            user=request.user).select_related('ingredient').order_by(
+            'ingredient__name')
+        serializer = ShoppingListItemSerializer(shopping_list, many=True)
+        return Response(serializer.data)
+
+    def get_ranked(self, request, score):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            ranking__isnull=False).order_by(f'-ranking__{score}', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        url_path='popular',
+        methods=['get'],
+        detail=False
+    )
+    def get_popular(self, request):
+        return self.get_ranked(request, 'popular_score')
+
+    @action(
+        url_path='trending',
+        methods=['get'],
+        detail=False
+    )
+    def get_trending(self, request):
+        return self.get_ranked(request, 'trending_score')
+
+    @action(
+        url_path='by_ingredients',
+        methods=['get'],
+        detail=False
+    )
+    def get_by_ingredients(self, request):
+        ingredient_ids = [
+            pk for value in request.query_params.getlist('ingredients')
+            for pk in value.split(',') if pk]
+        if not ingredient_ids or not all(pk.isdigit()
+                                         for pk in ingredient_ids):
+            return Response(
+                'Укажите id имеющихся ингредиентов в параметре ingredients.',
+                status=status.HTTP_400_BAD_REQUEST)
+        limit = request.query_params.get('limit') or '10'
+        if not limit.isdigit() or int(limit) < 1:
+            return Response(
+                'Параметр limit должен быть положительным числом.',
+                status=status.HTTP_400_BAD_REQUEST)
+        limit = min(int(limit), MATCH_LIMIT)
+        matches = pantry_index.match(map(int, ingredient_ids), limit)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in matches])
+        ingredients = Ingredient.objects.in_bulk(
+            {pk for _, _, missing in matches for pk in missing})
+        data = [{'recipe': recipes[recipe_id], 'matched': matched,
+                 'missing': [ingredients[pk] for pk in missing]}
+                for recipe_id, matched, missing in matches
+                if recipe_id in recipes]
+        serializer = RecipeMatchSerializer(
+            data, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @transaction.atomic
     def common_method(self, request, pk, table):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -125,3 +269,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_favorite(self, request, pk):
         return RecipeViewSet.common_method(self, request, pk, Favorite)
+
+
+def metrics(request):
+    """Метрики запросов в текстовом формате Prometheus.
+
+    Доступны по токену METRICS_TOKEN (если он задан) и сотрудникам,
+    вошедшим в админку.
+    """
+    token = settings.METRICS_TOKEN
+    has_token = bool(token) and (
+        request.headers.get('Authorization') == f'Bearer {token}')
+    if not (has_token or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .db import estimate_count
+
+# Ниже этой оценки число строк в админке считается точно
+EXACT_COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для админки: на больших таблицах вместо COUNT(*)
+    использует оценку планировщика."""
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Без полного COUNT(*) таблицы и с оценкой числа строк."""
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
@@ -5,7 +5,7 @@ from .models import Ingredient, Tag
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
-    list_filter = ('name',)
+    search_fields = ('^name',)
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -0,0 +1,68 @@
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса для автодополнения.
+
+    Строится лениво при первом поиске, сбрасывается сигналами при
+    изменении ингредиентов и, чтобы другие воркеры не отдавали
+    устаревшие данные, перестраивается не реже раза в ``ttl`` секунд.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.invalidate()
+
+    def invalidate(self):
+        self._names = None
+        self._ingredients = None
+        self._built_at = None
+
+    def _is_stale(self):
+        ttl = self.ttl
+        if ttl is None:
+            ttl = getattr(settings, 'INGREDIENT_INDEX_TTL', 300)
+        return (self._names is None
+                or time.monotonic() - self._built_at > ttl)
+
+    def _build(self):
+        ingredients = sorted(
+            Ingredient.objects.only('id', 'name', 'measurement_unit'),
+            key=lambda ingredient: (ingredient.name.lower(), ingredient.id))
+        self._names = [ingredient.name.lower() for ingredient in ingredients]
+        self._ingredients = ingredients
+        self._built_at = time.monotonic()
+
+    def search(self, query, limit=None):
+        """Ингредиенты, в названии которых встречается ``query``.
+
+        Сначала идут названия, начинающиеся с ``query``, затем остальные
+        совпадения в порядке позиции вхождения.
+        """
+        if self._is_stale():
+            self._build()
+        names, ingredients = self._names, self._ingredients
+        query = query.strip().lower()
+        start = bisect_left(names, query)
+        end = start
+        while end < len(names) and names[end].startswith(query):
+            end += 1
+        result = ingredients[start:end]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        substring_matches = sorted(
+            (position, index)
+            for index, position in enumerate(
+                name.find(query) for name in names)
+            if position > 0
+        )
+        result.extend(ingredients[index] for _, index in substring_matches)
+        return result if limit is None else result[:limit]
+
+
+ingredient_index = IngredientIndex()
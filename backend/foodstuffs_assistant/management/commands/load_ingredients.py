@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api import cache
+from foodstuffs_assistant.models import Ingredient
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, '..', 'data', 'ingredients.csv')
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if not row:
+                continue
+            # ingredients_new.csv содержит дополнительный столбец с id
+            name, measurement_unit = row[-2], row[-1]
+            yield name.strip(), measurement_unit.strip()
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as file:
+        for item in json.load(file):
+            yield item['name'].strip(), item['measurement_unit'].strip()
+
+
+class Command(BaseCommand):
+    help = ('Загружает ингредиенты из CSV или JSON файла. '
+            'Ингредиенты, уже существующие с той же единицей '
+            'измерения, не дублируются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл {path} не найден.')
+        reader = read_json if path.endswith('.json') else read_csv
+        started = time.monotonic()
+
+        # одно название может встречаться с разными единицами измерения
+        existing = set(Ingredient.objects.values_list(
+            'name', 'measurement_unit'))
+        new_rows = {}
+        total = 0
+        for row in reader(path):
+            total += 1
+            if row not in existing:
+                new_rows[row] = None
+        use_copy = (connection.vendor == 'postgresql'
+                    and not options['no_copy'])
+        with transaction.atomic():
+            if use_copy:
+                self.copy_rows(new_rows)
+            else:
+                Ingredient.objects.bulk_create(
+                    (Ingredient(name=name, measurement_unit=unit)
+                     for name, unit in new_rows),
+                    batch_size=options['batch_size'])
+            # bulk_create и COPY не вызывают сигналы
+            cache.bump_table_version(Ingredient)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, добавлено: {len(new_rows)}, '
+            f'пропущено: {total - len(new_rows)}. '
+            f'{elapsed:.2f} с, {total / max(elapsed, 1e-6):.0f} строк/с.'))
+
+    def copy_rows(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {Ingredient._meta.db_table} (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)', buffer)
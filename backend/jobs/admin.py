@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'status', 'attempts', 'created_at',
+                    'finished_at')
+    list_filter = ('status', 'task')
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue, worker
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих фоновые задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--max-attempts', type=int, default=3)
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Через сколько секунд вернуть в очередь зависшую задачу.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и завершиться.')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        batch_size = options['batch_size'] or processes * 4
+        requeued = queue.requeue_stale(options['stale_after'])
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь задач: {requeued}.')
+        # соединение с БД не должно наследоваться дочерними процессами
+        connections.close_all()
+        with multiprocessing.Pool(processes, initializer=worker.init) as pool:
+            while True:
+                ids = queue.claim(batch_size)
+                if not ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                started = time.monotonic()
+                statuses = pool.map(worker.run_job, [
+                    (job_id, options['max_attempts']) for job_id in ids])
+                self.stdout.write(
+                    f'Выполнено задач: {len(ids)}, '
+                    f'ошибок: {statuses.count(Job.FAILED)}, '
+                    f'{time.monotonic() - started:.2f} с.')
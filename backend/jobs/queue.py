@@ -0,0 +1,54 @@
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def enqueue(task, **kwargs):
+    """Ставит задачу в очередь.
+
+    ``task`` — путь к функции вида ``'recipes.images.process'``.
+    Внутри транзакции задача станет видна воркерам только после commit.
+    """
+    return Job.objects.create(task=task, kwargs=kwargs)
+
+
+def claim(limit):
+    """Забирает до ``limit`` задач из очереди и помечает их запущенными."""
+    with transaction.atomic():
+        ids = list(Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.PENDING).order_by('id').values_list(
+            'id', flat=True)[:limit])
+        Job.objects.filter(id__in=ids).update(
+            status=Job.RUNNING, started_at=timezone.now(),
+            attempts=F('attempts') + 1)
+    return ids
+
+
+def requeue_stale(timeout):
+    """Возвращает в очередь задачи, зависшие после падения воркера."""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=Job.PENDING)
+
+
+def run(job_id, max_attempts):
+    job = Job.objects.get(id=job_id)
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        job.status = (Job.PENDING if job.attempts < max_attempts
+                      else Job.FAILED)
+    else:
+        job.error = ''
+        job.status = Job.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=('status', 'error', 'finished_at'))
+    return job.status
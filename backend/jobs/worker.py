@@ -0,0 +1,17 @@
+"""Функции, выполняемые в дочерних процессах пула воркеров.
+
+Модуль не импортирует модели при загрузке: при старте через spawn
+он распаковывается в процессе, где Django ещё не настроен.
+"""
+import django
+
+
+def init():
+    django.setup()
+
+
+def run_job(args):
+    from . import queue
+
+    job_id, max_attempts = args
+    return queue.run(job_id, max_attempts)
@@ -1,38 +1,91 @@
 from django.contrib import admin
 
-from .models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from foodgram.admin_utils import LargeTableAdmin
+from . import shopping_list
+from .models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                     ShoppingListItem)
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'author')
-    list_filter = ('author', 'name', 'tags')
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('pk', 'name', 'author', 'count_favorite',
+                    'in_carts_count')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', '=author__username')
+    autocomplete_fields = ('author',)
     readonly_fields = ('count_favorite',)
     inlines = (RecipeIngredientInline,)
     add_fieldsets = ((None, {'fields': ('count_favorite',), }),)
 
     def count_favorite(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
     count_favorite.short_description = 'Количество добавлений в избранное'
+    count_favorite.admin_order_field = 'favorites_count'
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            shopping_list.rebuild(form.instance.added_to_cart.values_list(
+                'user_id', flat=True))
 
-class RecipeIngredientAdmin(admin.ModelAdmin):
+
+class RecipeIngredientAdmin(LargeTableAdmin):
+    """Изменения состава пересчитывают списки покупок пользователей,
+    у которых рецепт в корзине."""
     list_display = ('pk', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+
+    def rebuild_shopping_lists(self, recipe_ids):
+        shopping_list.rebuild(ShoppingCart.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+            'user_id', flat=True).distinct())
+
+    def save_model(self, request, obj, form, change):
+        # строку могли перенести в другой рецепт: пересчитываем оба
+        recipe_ids = {obj.recipe_id}
+        if change:
+            recipe_ids.update(RecipeIngredient.objects.filter(
+                pk=obj.pk).values_list('recipe_id', flat=True))
+        super().save_model(request, obj, form, change)
+        self.rebuild_shopping_lists(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.rebuild_shopping_lists([obj.recipe_id])
 
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.rebuild_shopping_lists(recipe_ids)
 
-class FavoriteAdmin(admin.ModelAdmin):
+
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ('pk', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     list_display = ('pk', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+
+class ShoppingListItemAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'ingredient', 'total_amount')
+    list_select_related = ('user', 'ingredient')
+    autocomplete_fields = ('user', 'ingredient')
 
 
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
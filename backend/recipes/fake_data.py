@@ -0,0 +1,213 @@
+"""Синтетические пользователи, рецепты и связи для нагрузочных тестов.
+
+Популярность рецептов, плодовитость авторов и число подписчиков
+распределены по Ципфу: вес объекта ранга r равен 1 / r ** skew.
+Пользователи и рецепты создаются через bulk_create с заранее
+назначенными id, таблицы связей пишутся через COPY на PostgreSQL и
+executemany на остальных СУБД. Сигналы при этом не срабатывают:
+счётчики, поисковый индекс и рейтинги пересчитываются в конце.
+"""
+import csv
+import io
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from foodstuffs_assistant.models import Ingredient, Tag
+from users.models import Follow, User
+from . import images, rankings, search
+from .models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+
+PASSWORD = 'benchmark'
+IMAGES_DIR = 'recipes/images/fake'
+TAGS = (('Завтрак', '#E26C2D', 'breakfast'), ('Обед', '#49B64E', 'lunch'),
+        ('Ужин', '#8775D2', 'dinner'))
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'рагу', 'запеканка', 'омлет',
+    'плов', 'борщ', 'котлеты', 'блины', 'паста', 'соус', 'жаркое',
+    'куриный', 'овощной', 'грибной', 'рыбный', 'сырный', 'домашний',
+    'быстрый', 'летний', 'острый', 'сладкий', 'мамин', 'праздничный',
+)
+# Добавления в избранное и корзину распределены по этому периоду
+ACTIVITY_PERIOD = timedelta(days=30)
+
+
+class FakeDataGenerator:
+    def __init__(self, seed=0, batch_size=10000, skew=1.0, use_copy=True,
+                 image_count=10):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.skew = skew
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.image_count = image_count
+        self.rows = 0
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def zipf(self, ids):
+        """Распределение по Ципфу: перемешанные ids (ранг не связан с
+        id) и накопленные веса для random.choices."""
+        population = list(ids)
+        self.random.shuffle(population)
+        cum_weights, total = [], 0.0
+        for rank in range(1, len(population) + 1):
+            total += rank ** -self.skew
+            cum_weights.append(total)
+        return population, cum_weights
+
+    def skewed(self, distribution, count):
+        population, cum_weights = distribution
+        return self.random.choices(population, cum_weights=cum_weights,
+                                   k=count)
+
+    def pairs(self, count, left_ids, right, exclude_equal=False):
+        """До ``count`` уникальных пар: левый элемент выбирается
+        равномерно, правый — по распределению ``right``."""
+        pairs = set()
+        while len(pairs) < count:
+            needed = count - len(pairs)
+            before = len(pairs)
+            pairs.update(
+                pair for pair in zip(
+                    self.random.choices(left_ids, k=needed),
+                    self.skewed(right, needed))
+                if not (exclude_equal and pair[0] == pair[1]))
+            # популярные пары уже все выбраны, новых почти не появляется
+            if len(pairs) - before < needed // 100 + 1:
+                break
+        return sorted(pairs)
+
+    def insert(self, model, fields, rows):
+        """Пишет строки в таблицу пачками, минуя создание моделей."""
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while True:
+                batch = [row for _, row in zip(range(self.batch_size), rows)]
+                if not batch:
+                    return
+                self.rows += len(batch)
+                if not self.use_copy:
+                    cursor.executemany(
+                        f'INSERT INTO {table} ({columns}) '
+                        f'VALUES ({placeholders})', batch)
+                    continue
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                    buffer)
+
+    def activity_times(self, count):
+        """Случайные моменты за ACTIVITY_PERIOD с точностью до минуты,
+        уже приведённые к формату базы."""
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        minutes = [adapt(now - timedelta(minutes=minute)) for minute in
+                   range(int(ACTIVITY_PERIOD.total_seconds() // 60))]
+        return self.random.choices(minutes, k=count)
+
+    def create_images(self):
+        """Небольшие однотонные JPEG и их копии для полей image."""
+        names = []
+        for number in range(self.image_count):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (640, 480), color).save(buffer, 'JPEG')
+            name = f'{IMAGES_DIR}/placeholder_{number}.jpg'
+            default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+            images.create_renditions(name)
+            names.append(name)
+        return names
+
+    def create_users(self, count):
+        first_id = self.next_id(User)
+        password = make_password(PASSWORD)
+        user_ids = list(range(first_id, first_id + count))
+        User.objects.bulk_create((
+            User(id=pk, username=f'user{pk}', email=f'user{pk}@example.com',
+                 first_name=f'Имя{pk}', last_name=f'Фамилия{pk}',
+                 password=password)
+            for pk in user_ids), batch_size=self.batch_size)
+        self.rows += count
+        return user_ids
+
+    def create_recipes(self, count, author_ids, tag_ids, ingredient_ids):
+        first_id = self.next_id(Recipe)
+        recipe_ids = list(range(first_id, first_id + count))
+        authors = self.skewed(self.zipf(author_ids), count)
+        image_names = self.create_images() or [None]
+        choice, sample = self.random.choice, self.random.sample
+        Recipe.objects.bulk_create((
+            Recipe(id=pk, author_id=author_id,
+                   name=' '.join(sample(WORDS, 2)).capitalize(),
+                   text=' '.join(choice(WORDS) for _ in range(30)),
+                   cooking_time=self.random.randint(5, 180),
+                   image=choice(image_names))
+            for pk, author_id in zip(recipe_ids, authors)),
+            batch_size=self.batch_size)
+        self.rows += count
+        self.insert(Recipe.tags.through, ('recipe', 'tag'), (
+            (pk, tag_id) for pk in recipe_ids
+            for tag_id in sample(tag_ids, self.random.randint(1, 2))))
+        self.insert(RecipeIngredient, ('recipe', 'ingredient', 'amount'), (
+            (pk, ingredient_id, self.random.randint(1, 500))
+            for pk in recipe_ids
+            for ingredient_id in sample(ingredient_ids,
+                                        self.random.randint(3, 10))))
+        return recipe_ids
+
+    def run(self, users, recipes, favorites, follows, carts):
+        """Создаёт данные заданного объёма, возвращает id пользователей
+        и рецептов."""
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', verbosity=0)
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color})
+        with transaction.atomic():
+            user_ids = self.create_users(users)
+            recipe_ids = self.create_recipes(
+                recipes, user_ids, list(Tag.objects.values_list(
+                    'id', flat=True)),
+                list(Ingredient.objects.values_list('id', flat=True)))
+            popularity = self.zipf(recipe_ids)
+            for model, count in ((Favorite, favorites),
+                                 (ShoppingCart, carts)):
+                pairs = self.pairs(count, user_ids, popularity)
+                self.insert(model, ('user', 'recipe', 'created_at'), (
+                    pair + (created_at,) for pair, created_at in zip(
+                        pairs, self.activity_times(len(pairs)))))
+            self.insert(Follow, ('user', 'author'), self.pairs(
+                follows, user_ids, self.zipf(user_ids), exclude_equal=True))
+            self.reset_sequences()
+        call_command('rebuild_shopping_lists', verbosity=0)
+        call_command('recount', verbosity=0)
+        search.index_recipes()
+        rankings.refresh()
+        return user_ids, recipe_ids
+
+    def reset_sequences(self):
+        """После вставки с явными id сдвигает последовательности."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Recipe])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,120 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from jobs import queue
+from .models import Recipe
+
+IMAGES_DIR = 'recipes/images'
+RENDITIONS_DIR = f'{IMAGES_DIR}/renditions'
+# Название размера -> ширина в пикселях
+RENDITION_WIDTHS = {'card': 480, 'detail': 1200}
+# Формат Pillow -> расширение файла
+RENDITION_FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def rendition_name(image_name, size, image_format):
+    """Имя копии строится из полного пути оригинала вместе с
+    расширением: temp.png и temp.jpg дают разные копии."""
+    if image_name.startswith(f'{IMAGES_DIR}/'):
+        image_name = posixpath.relpath(image_name, IMAGES_DIR)
+    return (f'{RENDITIONS_DIR}/{image_name}_{size}.'
+            f'{RENDITION_FORMATS[image_format]}')
+
+
+def rendition_names(image_name):
+    return [rendition_name(image_name, size, image_format)
+            for size in RENDITION_WIDTHS
+            for image_format in RENDITION_FORMATS]
+
+
+def renditions_exist(image_name):
+    return default_storage.exists(
+        rendition_name(image_name, 'card', 'WEBP'))
+
+
+def create_renditions(image_name):
+    """Сохраняет уменьшенные копии изображения в JPEG и WebP."""
+    with default_storage.open(image_name, 'rb') as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+    for size, width in RENDITION_WIDTHS.items():
+        image = original
+        if image.width > width:
+            image = image.resize(
+                (width, round(image.height * width / image.width)),
+                Image.LANCZOS)
+        for image_format in RENDITION_FORMATS:
+            has_alpha = image.mode in ('RGBA', 'LA', 'P')
+            converted = image.convert(
+                'RGBA' if has_alpha and image_format == 'WEBP' else 'RGB')
+            buffer = BytesIO()
+            converted.save(buffer, image_format, quality=82)
+            name = rendition_name(image_name, size, image_format)
+            default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_renditions(image_name):
+    for name in rendition_names(image_name):
+        default_storage.delete(name)
+
+
+def schedule_deletion(image_name):
+    """Удаляет файлы изображения в фоне после фиксации транзакции."""
+    transaction.on_commit(lambda: queue.enqueue(
+        'recipes.images.delete_images', image_names=[image_name]))
+
+
+def delete_images(image_names):
+    """Фоновая задача: удаляет изображения, на которые нет ссылок."""
+    referenced = set(Recipe.objects.filter(
+        image__in=image_names).values_list('image', flat=True))
+    for image_name in image_names:
+        if image_name not in referenced:
+            default_storage.delete(image_name)
+            delete_renditions(image_name)
+
+
+def rendition_urls(image_name, build_url):
+    """Ссылки на копии изображения, пригодные для srcset."""
+    images = {'original': build_url(default_storage.url(image_name))}
+    srcset = {RENDITION_FORMATS[image_format]: []
+              for image_format in RENDITION_FORMATS}
+    for size, width in RENDITION_WIDTHS.items():
+        images[size] = {'width': width}
+        for image_format, ext in RENDITION_FORMATS.items():
+            url = build_url(default_storage.url(
+                rendition_name(image_name, size, image_format)))
+            images[size][ext] = url
+            srcset[ext].append(f'{url} {width}w')
+    images['srcset'] = {
+        ext: ', '.join(urls) for ext, urls in srcset.items()}
+    return images
+
+
+def process_recipe_image(recipe_id):
+    """Фоновая задача: проверяет изображение рецепта и создаёт копии."""
+    while True:
+        image_name = Recipe.objects.filter(pk=recipe_id).values_list(
+            'image', flat=True).first()
+        if not image_name:
+            return
+        try:
+            create_renditions(image_name)
+            status = Recipe.IMAGE_READY
+        except (OSError, Image.DecompressionBombError):
+            status = Recipe.IMAGE_FAILED
+        with transaction.atomic():
+            recipe = Recipe.objects.select_for_update().filter(
+                pk=recipe_id).first()
+            # изображение могли заменить, пока шла обработка
+            if recipe is None or recipe.image.name != image_name:
+                continue
+            recipe.image_status = status
+            recipe.save(update_fields=('image_status',))
+            return
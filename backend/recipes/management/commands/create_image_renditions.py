@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии, даже если они уже есть.')
+
+    def handle(self, *args, **options):
+        created = 0
+        for image_name in Recipe.objects.exclude(image='').exclude(
+                image__isnull=True).values_list('image', flat=True).iterator():
+            if options['force'] or not images.renditions_exist(image_name):
+                images.create_renditions(image_name)
+                created += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано копий для изображений: {created}.'))
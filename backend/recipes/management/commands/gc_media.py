@@ -0,0 +1,76 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe
+
+
+def scan_files(path):
+    """Рекурсивно обходит каталог, не собирая список файлов в память."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из MEDIA_ROOT изображения рецептов и их копии, '
+            'на которые не ссылается ни один рецепт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе указанного числа секунд.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        referenced = set()
+        for image_name in Recipe.objects.exclude(image='').exclude(
+                image__isnull=True).values_list('image', flat=True).iterator():
+            referenced.add(image_name)
+            referenced.update(images.rendition_names(image_name))
+        newest = time.time() - options['min_age']
+
+        scanned = removed = freed = 0
+        batch = []
+        root = os.path.join(settings.MEDIA_ROOT, images.IMAGES_DIR)
+        for entry in scan_files(root) if os.path.isdir(root) else ():
+            scanned += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > newest:
+                continue
+            name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+            if name.replace(os.sep, '/') not in referenced:
+                batch.append(entry.path)
+                removed += 1
+                freed += stat.st_size
+            if len(batch) >= options['batch_size']:
+                self.remove(batch, options['dry_run'])
+                batch = []
+        self.remove(batch, options['dry_run'])
+
+        elapsed = time.monotonic() - started
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Просмотрено файлов: {scanned}. {action}: {removed} '
+            f'({freed / 1024 / 1024:.1f} МБ). {elapsed:.2f} с, '
+            f'{scanned / max(elapsed, 1e-6):.0f} файлов/с.'))
+
+    def remove(self, paths, dry_run):
+        for path in paths:
+            if dry_run:
+                self.stdout.write(path)
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
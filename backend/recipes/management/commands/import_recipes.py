@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import cache
+from recipes.ndjson import RecipeImporter
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из файла JSON Lines, выгруженного через '
+            '/api/recipes/export/. Изображения должны уже лежать в '
+            'MEDIA_ROOT по указанным путям.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или "-" для stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = RecipeImporter(options['batch_size'])
+        if options['path'] == '-':
+            importer.run(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as file:
+                importer.run(file)
+        # до веб-сервера версия дойдёт только через общий кеш (memcached
+        # в docker-compose), LocMem у каждого процесса свой
+        cache.bump_catalog_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено рецептов: {importer.created}, '
+            f'пропущено: {importer.skipped}. {elapsed:.2f} с, '
+            f'{importer.created / max(elapsed, 1e-6):.0f} рецептов/с.'))
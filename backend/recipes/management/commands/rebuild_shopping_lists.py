@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes import shopping_list
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок по содержимому корзин.'
+
+    def handle(self, *args, **options):
+        user_ids = set(
+            ShoppingCart.objects.values_list('user_id', flat=True))
+        user_ids.update(
+            ShoppingListItem.objects.values_list('user_id', flat=True))
+        shopping_list.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано списков покупок: {len(user_ids)}.'))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User, UserStats
+
+
+def count_of(model, field):
+    """Подзапрос: число строк ``model``, ссылающихся на текущую строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')), 0)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного и корзин у рецептов, '
+            'рецептов и подписчиков у пользователей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in User.objects.filter(
+                stats__isnull=True).values_list('id', flat=True)],
+            ignore_conflicts=True)
+        recipes = self.recount(Recipe.objects.all(), options['batch_size'], {
+            'favorites_count': count_of(Favorite, 'recipe'),
+            'in_carts_count': count_of(ShoppingCart, 'recipe'),
+        })
+        users = self.recount(UserStats.objects.all(), options['batch_size'], {
+            'recipes_count': count_of(Recipe, 'author'),
+            'followers_count': count_of(Follow, 'author'),
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: рецептов {recipes}, '
+            f'пользователей {users}.'))
+
+    def recount(self, queryset, batch_size, counters):
+        """Обновляет по диапазонам pk только строки с расхождениями."""
+        drift = Q()
+        for field in counters:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        fixed = last_pk = 0
+        while True:
+            batch = queryset.filter(pk__gt=last_pk).order_by('pk')
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return fixed
+            last_pk = pks[-1]
+            with transaction.atomic():
+                drifted = list(queryset.filter(pk__in=pks).annotate(**{
+                    f'actual_{field}': counter
+                    for field, counter in counters.items()
+                }).filter(drift).values_list('pk', flat=True))
+                if drifted:
+                    queryset.filter(pk__in=drifted).update(**counters)
+            fixed += len(drifted)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import rankings
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинги popular и trending. С --interval '
+            'работает постоянно, пересчитывая их периодически.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Период пересчёта в секундах (0 — пересчитать один раз).')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            created = rankings.refresh()
+            self.stdout.write(self.style.SUCCESS(
+                f'Рейтинги пересчитаны за '
+                f'{time.monotonic() - started:.2f} с, '
+                f'новых рецептов: {created}.'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 23:40
+
+from django.db import migrations
+
+# Столбец и индексы нужны только PostgreSQL: в модели их нет,
+# на других СУБД поиск работает через индекс в памяти (recipes/search.py)
+FORWARD_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+    'USING GIN (search_vector)',
+    'CREATE INDEX recipe_name_trgm_idx ON recipes_recipe '
+    'USING GIN (name gin_trgm_ops)',
+    '''UPDATE recipes_recipe SET search_vector =
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredient AS item
+            JOIN foodstuffs_assistant_ingredient AS ingredient
+                ON ingredient.id = item.ingredient_id
+            WHERE item.recipe_id = recipes_recipe.id), '')), 'B')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'C')''',
+)
+BACKWARD_SQL = (
+    'DROP INDEX IF EXISTS recipe_name_trgm_idx',
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD_SQL),
+                             run_postgresql(BACKWARD_SQL)),
+    ]
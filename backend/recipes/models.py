@@ -1,11 +1,50 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Value
 
 from foodstuffs_assistant.models import Ingredient, Tag
-from users.models import User
+from users.models import Follow, User
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient')
+            )
+        )
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()),
+                is_subscribed=Value(False, output_field=models.BooleanField())
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author')))
+        )
 
 
 class Recipe(models.Model):
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUSES = (
+        (IMAGE_PENDING, 'Обрабатывается'),
+        (IMAGE_READY, 'Готово'),
+        (IMAGE_FAILED, 'Ошибка обработки'),
+    )
+
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='recipes', verbose_name='Автор')
@@ -15,6 +54,9 @@ class Recipe(models.Model):
                               blank=False, default=None,
                               verbose_name='Фотография блюда',
                               help_text='Загрузите картинку')
+    image_status = models.CharField(max_length=16, choices=IMAGE_STATUSES,
+                                    default=IMAGE_READY,
+                                    verbose_name='Статус изображения')
     text = models.TextField(null=True, blank=False, verbose_name='Описание')
     ingredients = models.ManyToManyField(Ingredient, blank=False,
                                          through='RecipeIngredient',
@@ -25,6 +67,14 @@ class Recipe(models.Model):
                                   verbose_name='Тэг')
     cooking_time = models.PositiveIntegerField(
         validators=[MinValueValidator(1)], verbose_name='Время готовки')
+    favorites_count = models.IntegerField(
+        default=0, editable=False,
+        verbose_name='Количество добавлений в избранное')
+    in_carts_count = models.IntegerField(
+        default=0, editable=False,
+        verbose_name='Количество добавлений в корзину')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -60,6 +110,8 @@ class Favorite(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE,
         related_name='favorites', verbose_name='Рецепт')
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Дата добавления')
 
     class Meta:
         verbose_name_plural = 'Избранное'
@@ -78,6 +130,8 @@ class ShoppingCart(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE,
         related_name='added_to_cart', verbose_name='Рецепт')
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Дата добавления')
 
     class Meta:
         verbose_name_plural = 'Продуктовая корзина'
@@ -87,3 +141,47 @@ class ShoppingCart(models.Model):
                 fields=['user', 'recipe'],
                 name='unique_recipe_in_cart',)
         ]
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shopping_list', verbose_name='Пользователь')
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE,
+        related_name='shopping_list_items', verbose_name='Ингредиент')
+    total_amount = models.IntegerField(default=0, verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        ordering = ['user']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item',)
+        ]
+
+
+class RecipeRanking(models.Model):
+    """Снимок рейтингов рецепта; пересчитывается командой
+    refresh_rankings, чтобы не агрегировать избранное на каждый запрос."""
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='ranking', verbose_name='Рецепт')
+    popular_score = models.FloatField(
+        default=0, verbose_name='Популярность')
+    trending_score = models.FloatField(
+        default=0, verbose_name='Популярность за последнее время')
+    refreshed_at = models.DateTimeField(db_index=True,
+                                        verbose_name='Дата пересчёта')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(fields=['-popular_score'],
+                         name='recipe_popular_idx'),
+            models.Index(fields=['-trending_score'],
+                         name='recipe_trending_idx'),
+        ]
@@ -0,0 +1,175 @@
+"""Выгрузка и загрузка рецептов в формате JSON Lines (NDJSON).
+
+Каждая строка — один рецепт. Автор указывается по email, тэги — по
+слагу, ингредиенты — по названию и единице измерения, изображение —
+путём в хранилище, без встраивания содержимого.
+"""
+import json
+from collections import Counter
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import F, Prefetch
+
+from foodstuffs_assistant.models import Ingredient, Tag
+from jobs.models import Job
+from users.models import User, UserStats
+from . import search
+from .models import Recipe, RecipeIngredient
+
+
+def export_recipes(chunk_size=500):
+    """Генератор строк NDJSON; рецепты читаются порциями по ``id``."""
+    last_id = 0
+    while True:
+        chunk = list(Recipe.objects.filter(id__gt=last_id).order_by(
+            'id').select_related('author').prefetch_related(
+            'tags',
+            Prefetch('recipeingredients',
+                     queryset=RecipeIngredient.objects.select_related(
+                         'ingredient'))
+        )[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield json.dumps({
+                'id': recipe.id,
+                'author': recipe.author.email,
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'image': recipe.image.name or None,
+                'tags': [tag.slug for tag in recipe.tags.all()],
+                'ingredients': [
+                    {'name': item.ingredient.name,
+                     'measurement_unit': item.ingredient.measurement_unit,
+                     'amount': item.amount}
+                    for item in recipe.recipeingredients.all()],
+            }, ensure_ascii=False) + '\n'
+        last_id = chunk[-1].id
+
+
+def positive_int(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(value)
+    return value
+
+
+class RecipeImporter:
+    """Загружает рецепты пачками через bulk_create.
+
+    Рецепты, у которых не найден автор, тэг или ингредиент, нет
+    обязательных полей или время приготовления и количества не являются
+    положительными целыми, а также уже существующие (тот же автор и
+    название) пропускаются и учитываются в skipped.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        }
+        self.created = 0
+        self.skipped = 0
+
+    def run(self, lines):
+        rows = self.parse(lines)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic():
+                self.import_batch(batch)
+
+    def parse(self, lines):
+        """Разбирает строки; не-JSON и не-объекты сразу пропускаются."""
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if isinstance(row, dict):
+                yield row
+            else:
+                self.skipped += 1
+
+    def import_batch(self, batch):
+        authors = dict(User.objects.filter(email__in={
+            row['author'] for row in batch
+            if isinstance(row.get('author'), str)
+        }).values_list('email', 'id'))
+        existing = set(Recipe.objects.filter(
+            author_id__in=authors.values(), name__in={
+                row['name'] for row in batch
+                if isinstance(row.get('name'), str)
+            }).values_list('author_id', 'name'))
+        recipes, links = [], []
+        for row in batch:
+            resolved = self.resolve(row, authors)
+            if resolved is None or (
+                    resolved[0].author_id, resolved[0].name) in existing:
+                self.skipped += 1
+                continue
+            existing.add((resolved[0].author_id, resolved[0].name))
+            recipes.append(resolved[0])
+            links.append(resolved[1:])
+        self.save(recipes)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe, (tag_ids, _) in zip(recipes, links)
+            for tag_id in tag_ids)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredient_id,
+                             amount=amount)
+            for recipe, (_, amounts) in zip(recipes, links)
+            for ingredient_id, amount in amounts.items())
+        search.index_recipes([recipe.id for recipe in recipes])
+        self.created += len(recipes)
+
+    def resolve(self, row, authors):
+        """Рецепт, id тэгов и количества ингредиентов либо None, если
+        строка неполная или не проходит те же проверки, что и в API."""
+        try:
+            author_id = authors[row['author']]
+            tag_ids = {self.tags[slug] for slug in row['tags']}
+            amounts = {
+                self.ingredients[(item['name'], item['measurement_unit'])]:
+                    positive_int(item['amount'])
+                for item in row['ingredients']}
+            recipe = Recipe(
+                author_id=author_id, name=str(row['name']),
+                text=str(row['text']),
+                cooking_time=positive_int(row['cooking_time']),
+                image=row.get('image') or None,
+                image_status=(Recipe.IMAGE_PENDING if row.get('image')
+                              else Recipe.IMAGE_READY))
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not tag_ids or not amounts:
+            return None
+        return recipe, tag_ids, amounts
+
+    def save(self, recipes):
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            # bulk_create не вызывает сигналы, счётчики авторов обновляем
+            # сами
+            for author_id, count in Counter(
+                    recipe.author_id for recipe in recipes).items():
+                UserStats.objects.filter(user_id=author_id).update(
+                    recipes_count=F('recipes_count') + count)
+        else:
+            # без RETURNING id новых строк не узнать: сохраняем по одной,
+            # счётчики авторов обновляют сигналы
+            for recipe in recipes:
+                recipe.save()
+        # изображение задано уже при создании объекта, и сигнал post_save
+        # не считает его новым: задачи обработки ставим в обоих случаях
+        Job.objects.bulk_create(
+            Job(task='recipes.images.process_recipe_image',
+                kwargs={'recipe_id': recipe.id})
+            for recipe in recipes if recipe.image)
@@ -0,0 +1,106 @@
+"""Подбор рецептов по имеющимся у пользователя ингредиентам."""
+import heapq
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+
+from .models import RecipeIngredient
+
+
+class PantryIndex:
+    """Инвертированный индекс в памяти процесса: id ингредиента ->
+    отсортированный массив id рецептов, в которые он входит.
+
+    Строится лениво, обновляется сигналами по одному рецепту и, чтобы
+    другие воркеры не отдавали устаревшие данные, перестраивается
+    целиком не реже раза в ``ttl`` секунд.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.invalidate()
+
+    def invalidate(self):
+        self._postings = None
+        self._recipes = None
+        self._built_at = None
+
+    def _is_stale(self):
+        ttl = self.ttl
+        if ttl is None:
+            ttl = getattr(settings, 'PANTRY_INDEX_TTL', 300)
+        return (self._postings is None
+                or time.monotonic() - self._built_at > ttl)
+
+    def _build(self):
+        postings, recipes = {}, {}
+        rows = RecipeIngredient.objects.order_by(
+            'ingredient_id', 'recipe_id').values_list(
+            'ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator():
+            if ingredient_id not in postings:
+                postings[ingredient_id] = array('q')
+            postings[ingredient_id].append(recipe_id)
+            recipes.setdefault(recipe_id, []).append(ingredient_id)
+        self._postings = postings
+        self._recipes = {recipe_id: frozenset(ingredient_ids)
+                         for recipe_id, ingredient_ids in recipes.items()}
+        self._built_at = time.monotonic()
+
+    def remove_recipe(self, recipe_id):
+        if self._postings is None:
+            return
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            recipe_ids = self._postings[ingredient_id]
+            position = bisect_left(recipe_ids, recipe_id)
+            if (position < len(recipe_ids)
+                    and recipe_ids[position] == recipe_id):
+                del recipe_ids[position]
+
+    def update_recipe(self, recipe_id):
+        """Перечитывает из базы ингредиенты одного рецепта."""
+        if self._postings is None:
+            return
+        self.remove_recipe(recipe_id)
+        ingredient_ids = frozenset(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', flat=True))
+        if not ingredient_ids:
+            return
+        self._recipes[recipe_id] = ingredient_ids
+        for ingredient_id in ingredient_ids:
+            insort(self._postings.setdefault(ingredient_id, array('q')),
+                   recipe_id)
+
+    def match(self, ingredient_ids, limit=10):
+        """Лучшие рецепты по числу имеющихся ингредиентов.
+
+        Возвращает список ``(id рецепта, совпало, id недостающих)``:
+        больше совпадений — выше, при равенстве выше рецепт, которому
+        не хватает меньшего числа ингредиентов.
+        """
+        if self._is_stale():
+            self._build()
+        pantry = frozenset(ingredient_ids)
+        matched = Counter()
+        for ingredient_id in pantry:
+            matched.update(self._postings.get(ingredient_id, ()))
+        if not matched or limit < 1:
+            return []
+        # порог — k-е по величине число совпадений; сортируются только
+        # рецепты не ниже порога, а не все найденные
+        threshold = min(heapq.nlargest(limit, matched.values()))
+        recipes = self._recipes
+        best = heapq.nsmallest(
+            limit,
+            ((recipe_id, count) for recipe_id, count in matched.items()
+             if count >= threshold),
+            key=lambda item: (-item[1], len(recipes[item[0]]) - item[1],
+                              -item[0]))
+        return [(recipe_id, count, sorted(recipes[recipe_id] - pantry))
+                for recipe_id, count in best]
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,91 @@
+"""Рейтинги рецептов для главной страницы.
+
+``popular_score`` — взвешенная сумма счётчиков избранного и корзин.
+``trending_score`` — та же активность с экспоненциальным затуханием:
+при каждом пересчёте старый рейтинг умножается на коэффициент
+затухания за прошедшее время и к нему прибавляются только новые
+добавления, так что избранное целиком не перечитывается.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Case, F, FloatField, Max, OuterRef, Subquery,
+                              Value, When)
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeRanking, ShoppingCart
+
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 1.0
+# Период полураспада рейтинга trending, в часах
+TRENDING_HALF_LIFE = getattr(settings, 'TRENDING_HALF_LIFE', 72)
+# При первом пересчёте учитываются добавления за этот период
+INITIAL_WINDOW = timedelta(hours=TRENDING_HALF_LIFE * 10)
+CHUNK_SIZE = 500
+# Меньшие рейтинги обнуляются, чтобы не пересчитывать их бесконечно
+MIN_TRENDING_SCORE = 0.001
+
+
+def decay(hours):
+    return 0.5 ** (hours / TRENDING_HALF_LIFE)
+
+
+def new_activity(since, now):
+    """Вес добавлений в избранное и корзину за (since, now] по рецептам,
+    каждое с затуханием от момента добавления."""
+    scores = defaultdict(float)
+    for model, weight in ((Favorite, FAVORITE_WEIGHT),
+                          (ShoppingCart, CART_WEIGHT)):
+        events = model.objects.filter(
+            created_at__gt=since, created_at__lte=now).values_list(
+            'recipe_id', 'created_at')
+        for recipe_id, created_at in events.iterator():
+            hours = (now - created_at).total_seconds() / 3600
+            scores[recipe_id] += weight * decay(hours)
+    return scores
+
+
+def add_trending(scores, now):
+    items = list(scores.items())
+    for start in range(0, len(items), CHUNK_SIZE):
+        chunk = items[start:start + CHUNK_SIZE]
+        RecipeRanking.objects.filter(
+            recipe_id__in=[recipe_id for recipe_id, _ in chunk]
+        ).update(refreshed_at=now, trending_score=F('trending_score') + Case(
+            *(When(recipe_id=recipe_id, then=Value(score))
+              for recipe_id, score in chunk),
+            default=Value(0.0), output_field=FloatField()))
+
+
+@transaction.atomic
+def refresh():
+    """Обновляет снимок рейтингов; возвращает число новых рецептов.
+
+    Время прошлого пересчёта — наибольшее ``refreshed_at``: его получают
+    все строки, рейтинг которых изменился.
+    """
+    now = timezone.now()
+    last_refresh = RecipeRanking.objects.aggregate(
+        last=Max('refreshed_at'))['last'] or now - INITIAL_WINDOW
+    hours = (now - last_refresh).total_seconds() / 3600
+    RecipeRanking.objects.filter(trending_score__gt=0).update(
+        trending_score=Case(
+            When(trending_score__lt=MIN_TRENDING_SCORE / decay(hours),
+                 then=Value(0.0)),
+            default=F('trending_score') * decay(hours),
+            output_field=FloatField()),
+        refreshed_at=now)
+    created = RecipeRanking.objects.bulk_create(
+        [RecipeRanking(recipe_id=recipe_id, refreshed_at=now)
+         for recipe_id in Recipe.objects.filter(
+             ranking__isnull=True).values_list('id', flat=True)],
+        batch_size=1000, ignore_conflicts=True)
+    add_trending(new_activity(last_refresh, now), now)
+    popular = Subquery(Recipe.objects.filter(pk=OuterRef('recipe_id')).values(
+        score=F('favorites_count') * FAVORITE_WEIGHT
+        + F('in_carts_count') * CART_WEIGHT)[:1])
+    RecipeRanking.objects.annotate(actual=popular).exclude(
+        popular_score=F('actual')).update(popular_score=popular)
+    return len(created)
@@ -0,0 +1,154 @@
+"""Полнотекстовый поиск рецептов по названию, описанию и ингредиентам.
+
+На PostgreSQL используется столбец ``search_vector`` (tsvector с
+GIN-индексом, см. миграцию 0011) и, если ничего не нашлось, поиск по
+триграммам названия (pg_trgm). На остальных СУБД, например SQLite в
+тестах, работает инвертированный индекс в памяти процесса.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from difflib import get_close_matches
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+TRIGRAM_THRESHOLD = 0.3
+# Сколько лучших результатов отдаёт индекс в памяти: порядок задаётся
+# CASE по каждому id, а SQLite ограничивает число параметров запроса
+MAX_INDEX_RESULTS = 250
+# Вес совпадения в названии, ингредиентах и описании
+WEIGHTS = {'name': 3, 'ingredients': 2, 'text': 1}
+
+UPDATE_VECTOR_SQL = f'''
+    UPDATE recipes_recipe SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredient AS item
+            JOIN foodstuffs_assistant_ingredient AS ingredient
+                ON ingredient.id = item.ingredient_id
+            WHERE item.recipe_id = recipes_recipe.id), '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'C')
+'''
+TSQUERY = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+class InvertedIndex:
+    """Индекс слово -> {id рецепта: вес} для СУБД без полнотекстового
+    поиска. Строится лениво и сбрасывается при изменении рецептов."""
+
+    def __init__(self):
+        self.postings = None
+
+    def invalidate(self):
+        self.postings = None
+
+    def build(self):
+        postings = defaultdict(lambda: defaultdict(int))
+        for recipe_id, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text').iterator():
+            for token in tokenize(name):
+                postings[token][recipe_id] += WEIGHTS['name']
+            for token in tokenize(text):
+                postings[token][recipe_id] += WEIGHTS['text']
+        for recipe_id, name in RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient__name').iterator():
+            for token in tokenize(name):
+                postings[token][recipe_id] += WEIGHTS['ingredients']
+        self.postings = dict(postings)
+        self.tokens = sorted(self.postings)
+
+    def lookup(self, term):
+        """Веса рецептов для слов, начинающихся с ``term``."""
+        scores = defaultdict(int)
+        start = bisect_left(self.tokens, term)
+        for token in self.tokens[start:]:
+            if not token.startswith(term):
+                break
+            for recipe_id, weight in self.postings[token].items():
+                scores[recipe_id] += weight
+        if not scores:
+            for token in get_close_matches(term, self.tokens, n=3):
+                for recipe_id, weight in self.postings[token].items():
+                    scores[recipe_id] += weight
+        return scores
+
+    def search(self, query):
+        """Список id рецептов, содержащих все слова запроса, по убыванию
+        релевантности."""
+        if self.postings is None:
+            self.build()
+        total = None
+        for term in tokenize(query):
+            scores = self.lookup(term)
+            if total is None:
+                total = scores
+            else:
+                total = {recipe_id: weight + scores[recipe_id]
+                         for recipe_id, weight in total.items()
+                         if recipe_id in scores}
+        return sorted(total or (), key=lambda pk: (-total[pk], -pk))
+
+
+inverted_index = InvertedIndex()
+
+
+def index_recipes(recipe_ids=None):
+    """Обновляет поисковые данные рецептов (всех, если ids не заданы)."""
+    if not is_postgresql():
+        inverted_index.invalidate()
+        return
+    with connection.cursor() as cursor:
+        if recipe_ids is None:
+            cursor.execute(UPDATE_VECTOR_SQL)
+        else:
+            cursor.execute(UPDATE_VECTOR_SQL + ' WHERE id = ANY(%s)',
+                           [list(recipe_ids)])
+
+
+def schedule_indexing(recipe_id):
+    transaction.on_commit(lambda: index_recipes([recipe_id]))
+
+
+def search(queryset, query):
+    """Оставляет в ``queryset`` найденные рецепты, лучшие — первыми."""
+    if not tokenize(query):
+        return queryset
+    if not is_postgresql():
+        ids = inverted_index.search(query)[:MAX_INDEX_RESULTS]
+        return queryset.filter(id__in=ids).order_by(Case(
+            *(When(id=pk, then=Value(position))
+              for position, pk in enumerate(ids)),
+            output_field=IntegerField()))
+    found = queryset.annotate(
+        rank=RawSQL(
+            f'ts_rank(recipes_recipe.search_vector, {TSQUERY})', (query,)),
+    ).extra(
+        where=[f'recipes_recipe.search_vector @@ {TSQUERY}'], params=[query]
+    ).order_by('-rank', '-id')
+    if found.exists():
+        return found
+    # оператор % использует GIN-индекс по триграммам и порог из
+    # pg_trgm.similarity_threshold, фильтр по similarity() — нет
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, false)",
+            [str(TRIGRAM_THRESHOLD)])
+    return queryset.annotate(
+        rank=RawSQL('similarity(recipes_recipe.name, %s)', (query,)),
+    ).extra(
+        where=['recipes_recipe.name %% %s'], params=[query]
+    ).order_by('-rank', '-id')
@@ -0,0 +1,70 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe_id):
+    return Counter(dict(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+            'ingredient_id', 'amount')))
+
+
+def apply_delta(user_ids, delta):
+    """Прибавляет ``delta`` (ингредиент -> количество) к спискам покупок."""
+    delta = {ingredient: amount for ingredient, amount in delta.items()
+             if amount}
+    user_ids = list(user_ids)
+    if not user_ids or not delta:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            [ShoppingListItem(user_id=user_id, ingredient_id=ingredient)
+             for user_id in user_ids
+             for ingredient, amount in delta.items() if amount > 0],
+            batch_size=1000, ignore_conflicts=True)
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=delta)
+        items.update(total_amount=F('total_amount') + Case(
+            *(When(ingredient_id=ingredient, then=Value(amount))
+              for ingredient, amount in delta.items()),
+            default=Value(0)))
+        items.filter(total_amount__lte=0).delete()
+
+
+def add_recipe(user_id, recipe_id):
+    apply_delta((user_id,), recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    apply_delta((user_id,), {
+        ingredient: -amount
+        for ingredient, amount in recipe_amounts(recipe_id).items()})
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносит изменение состава рецепта в списки покупок."""
+    delta = Counter(new_amounts)
+    delta.subtract(old_amounts)
+    apply_delta(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True),
+        delta)
+
+
+def rebuild(user_ids):
+    """Пересчитывает списки покупок пользователей с нуля."""
+    user_ids = list(user_ids)
+    totals = RecipeIngredient.objects.filter(
+        recipe__added_to_cart__user__in=user_ids).values_list(
+        'recipe__added_to_cart__user', 'ingredient').annotate(
+        total=Sum('amount')).order_by()
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(user_id=user_id, ingredient_id=ingredient,
+                              total_amount=total)
+             for user_id, ingredient, total in totals.iterator()),
+            batch_size=1000)
@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from foodstuffs_assistant.models import Ingredient
+from jobs import queue
+from . import images, search, shopping_list
+from .pantry import pantry_index
+from users.models import UserStats
+from .models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+
+# Счётчик рецепта, который меняется при создании и удалении связи
+RECIPE_COUNTERS = {Favorite: 'favorites_count',
+                   ShoppingCart: 'in_carts_count'}
+
+
+def change_counter(queryset, field, delta):
+    # UPDATE ... SET field = field + delta: без чтения и гонок
+    queryset.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                       RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        change_counter(UserStats.objects.filter(user_id=instance.author_id),
+                       'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    change_counter(UserStats.objects.filter(user_id=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    # pre_delete: при каскадном удалении рецепта его ингредиенты
+    # ещё на месте
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._saved_image = image if isinstance(image, str) else None
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_image_processing(instance, **kwargs):
+    image_name = instance.image.name
+    if image_name == instance._saved_image:
+        return
+    if instance._saved_image:
+        images.schedule_deletion(instance._saved_image)
+    instance._saved_image = image_name
+    if not image_name:
+        return
+    Recipe.objects.filter(pk=instance.pk).update(
+        image_status=Recipe.IMAGE_PENDING)
+    instance.image_status = Recipe.IMAGE_PENDING
+    queue.enqueue('recipes.images.process_recipe_image',
+                  recipe_id=instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_files(instance, **kwargs):
+    if instance.image:
+        images.schedule_deletion(instance.image.name)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance, **kwargs):
+    # после фиксации транзакции ингредиенты рецепта уже записаны
+    search.schedule_indexing(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(**kwargs):
+    if not search.is_postgresql():
+        search.inverted_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def update_pantry_index(instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: pantry_index.update_recipe(recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry_index(instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: pantry_index.remove_recipe(recipe_id))
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = list(RecipeIngredient.objects.filter(
+        ingredient=instance).values_list('recipe_id', flat=True))
+    if recipe_ids:
+        transaction.on_commit(lambda: search.index_recipes(recipe_ids))
@@ -1,11 +1,23 @@
 from django.contrib import admin
 
-from .models import Follow
+from foodgram.admin_utils import LargeTableAdmin
+from .models import Follow, UserStats
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('pk', 'user', 'author')
-    list_filter = ('user',)
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    autocomplete_fields = ('user', 'author')
+
+
+class UserStatsAdmin(LargeTableAdmin):
+    list_display = ('user', 'recipes_count', 'followers_count')
+    readonly_fields = ('recipes_count', 'followers_count')
+    list_select_related = ('user',)
+    search_fields = ('=user__username',)
+    autocomplete_fields = ('user',)
 
 
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
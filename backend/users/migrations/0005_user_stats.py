@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 20:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('users', 'UserStats')
+    users = User.objects.annotate(
+        recipes_total=models.Count('recipes', distinct=True),
+        followers_total=models.Count('following', distinct=True),
+    ).values_list('id', 'recipes_total', 'followers_total')
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, recipes_count=recipes,
+                   followers_count=followers)
+         for user_id, recipes, followers in users.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_auto_20230510_0059'),
+        ('users', '0004_auto_20230503_1543'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('recipes_count', models.IntegerField(default=0, verbose_name='Количество рецептов')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Количество подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'ordering': ['user'], 'verbose_name_plural': 'Подписки на авторов'},
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -27,3 +27,22 @@ class Follow(models.Model):
                 name='unique_user_author',
             )
         ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые сигналами через F()."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    recipes_count = models.IntegerField(
+        default=0, verbose_name='Количество рецептов')
+    followers_count = models.IntegerField(
+        default=0, verbose_name='Количество подписчиков')
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
@@ -0,0 +1,24 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Follow, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_stats(instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(instance, created, **kwargs):
+    if created:
+        UserStats.objects.filter(user_id=instance.author_id).update(
+            followers_count=F('followers_count') + 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(instance, **kwargs):
+    UserStats.objects.filter(user_id=instance.author_id).update(
+        followers_count=F('followers_count') - 1)
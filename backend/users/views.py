@@ -1,3 +1,5 @@
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -8,6 +10,7 @@ from rest_framework.response import Response
 from api.pagination import CustomPageNumberPagination
 from api.permissions import IsAdminOrReadOnly
 from api.serializers import GetUserSerializer, UserSubscriptionSerializer
+from recipes.models import Recipe
 from users.models import Follow, User
 
 
@@ -17,6 +20,22 @@ class CustomUserViewSet(UserViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = CustomPageNumberPagination
 
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_anonymous:
+            is_subscribed = Value(False, output_field=BooleanField())
+        else:
+            is_subscribed = Exists(Follow.objects.filter(
+                user=user, author=OuterRef('pk')))
+        return super().get_queryset().annotate(
+            is_subscribed=is_subscribed).order_by('id')
+
+    def get_instance(self):
+        # на себя подписаться нельзя, запрос к подпискам не нужен
+        user = self.request.user
+        user.is_subscribed = False
+        return user
+
     @action(
         url_path='subscriptions',
         methods=['get'],
@@ -25,14 +44,17 @@ class CustomUserViewSet(UserViewSet):
     )
     def get_subscriptions(self, request):
         limit = self.request.query_params.get('recipes_limit')
+        recipes = Recipe.objects.all()
+        if limit and limit.isdigit():
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(author=OuterRef('author')).values(
+                    'id')[:int(limit)]))
         my_subs = User.objects.filter(
-            following__user=request.user).order_by('id')
+            following__user=request.user).select_related(
+            'stats').prefetch_related(
+            Prefetch('recipes', queryset=recipes)).order_by('id')
         pages = self.paginate_queryset(my_subs)
         serializer = UserSubscriptionSerializer(pages, many=True)
-        if limit:
-            for user in serializer.data:
-                if user.get('recipes'):
-                    user['recipes'] = user.get('recipes')[:int(limit)]
         return self.get_paginated_response(serializer.data)
 
     @action(